@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Fused inner-loop kernels for ensemble generation.
+
+Each kernel makes a single pass over the matrix, fusing the clamping,
+sampling, clipping and accumulation steps that would otherwise each
+materialize a full temporary array. When numba is installed the kernels
+are JIT compiled with parallel loops over the rows; otherwise the
+equivalent vectorized numpy implementations are used.
+
+The numpy samplers are exported under their own names as well, as the
+compiled kernels must not run in forked worker processes: the numba
+threading layer does not survive a fork and the workers can deadlock
+on its locks.
+
+---
+
+This file is part of oslo_method_python, a python implementation of the
+Oslo method.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+def gaussian_perturbation_numpy(raw: np.ndarray,
+                                std: np.ndarray = None) -> np.ndarray:
+    """ Draws x ~ N(raw, √raw) elementwise, clipped to x ≥ 0
+
+    Negative counts are given zero width.
+
+    Args:
+        raw: The matrix to perturb.
+        std: The precomputed √max(raw, 0), e.g. from a reused scratch
+            buffer. Computed here if None.
+    """
+    rng = np.random.default_rng()
+    if std is None:
+        std = np.sqrt(np.maximum(raw, 0))
+    perturbed = rng.normal(loc=raw, scale=std)
+    np.clip(perturbed, 0, None, out=perturbed)
+    return perturbed
+
+
+def poisson_perturbation_numpy(raw: np.ndarray) -> np.ndarray:
+    """ Draws x ~ Poisson(raw) elementwise
+
+    Negative counts are treated as zero.
+    """
+    rng = np.random.default_rng()
+    mean = np.maximum(raw, 0)
+    return rng.poisson(mean).astype(raw.dtype, copy=False)
+
+
+def welford_update_numpy(mean: np.ndarray, M2: np.ndarray, n: int,
+                         x: np.ndarray) -> None:
+    """ Folds the sample x into the running mean and M2 in place
+
+    Implements one step of Welford's online algorithm. After N samples
+    the standard deviation is √(M2/N), matching np.std along the
+    sample axis.
+    """
+    delta = x - mean
+    mean += delta / n
+    M2 += delta * (x - mean)
+
+
+if HAS_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def gaussian_perturbation(raw: np.ndarray) -> np.ndarray:
+        """ Draws x ~ N(raw, √raw) elementwise, clipped to x ≥ 0
+
+        Negative counts are given zero width.
+        """
+        out = np.empty_like(raw)
+        for i in prange(raw.shape[0]):
+            for j in range(raw.shape[1]):
+                mu = raw[i, j] if raw[i, j] > 0 else 0.0
+                x = np.random.normal(raw[i, j], np.sqrt(mu))
+                out[i, j] = x if x > 0 else 0.0
+        return out
+
+    @njit(parallel=True, cache=True)
+    def poisson_perturbation(raw: np.ndarray) -> np.ndarray:
+        """ Draws x ~ Poisson(raw) elementwise
+
+        Negative counts are treated as zero.
+        """
+        out = np.empty_like(raw)
+        for i in prange(raw.shape[0]):
+            for j in range(raw.shape[1]):
+                mu = raw[i, j] if raw[i, j] > 0 else 0.0
+                out[i, j] = np.random.poisson(mu)
+        return out
+
+    # No fastmath here: it would license reassociating the
+    # cancellation-sensitive M2 update.
+    @njit(parallel=True, cache=True)
+    def welford_update(mean: np.ndarray, M2: np.ndarray, n: int,
+                       x: np.ndarray) -> None:
+        """ Folds the sample x into the running mean and M2 in place
+
+        Implements one step of Welford's online algorithm. After N
+        samples the standard deviation is √(M2/N), matching np.std
+        along the sample axis.
+        """
+        for i in prange(mean.shape[0]):
+            for j in range(mean.shape[1]):
+                delta = x[i, j] - mean[i, j]
+                mean[i, j] += delta / n
+                M2[i, j] += delta * (x[i, j] - mean[i, j])
+
+else:
+    gaussian_perturbation = gaussian_perturbation_numpy
+    poisson_perturbation = poisson_perturbation_numpy
+    welford_update = welford_update_numpy
@@ -7,13 +7,23 @@ class Action:
     """ Allows for delayed method calls """
     def __init__(self, base='Matrix'):
         self.calls = []
-        if base.lower() == 'matrix':
+        self.base = base.lower()
+        if self.base == 'matrix':
             self.patch(Matrix)
-        elif base.lower() == 'vector':
+        elif self.base == 'vector':
             self.patch(Vector)
         else:
             raise ValueError("'base' must be 'Matrix' or 'Vector'")
 
+    def __getstate__(self):
+        # The patched methods are closures and can not be pickled.
+        # They are recreated from the base upon unpickling.
+        return {'base': self.base, 'calls': self.calls}
+
+    def __setstate__(self, state):
+        self.__init__(state['base'])
+        self.calls = state['calls']
+
     def __call__(self, target: Union[Matrix, Vector]) -> None:
         return self.act_on(target)
 
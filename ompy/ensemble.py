@@ -27,18 +27,24 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
+import hashlib
 import numpy as np
 import logging
+import multiprocessing
 import matplotlib.pyplot as plt
+from concurrent.futures import (ProcessPoolExecutor, ThreadPoolExecutor,
+                                as_completed)
 from tqdm import tqdm
-from typing import Callable, Union, List, Optional
+from typing import Callable, Union, List, Optional, FrozenSet
 from pathlib import Path
 from .matrix import Matrix
 from .rebin import rebin_2D
 from .action import Action
+from ._ensemble_kernels import (gaussian_perturbation, poisson_perturbation,
+                                gaussian_perturbation_numpy,
+                                poisson_perturbation_numpy, welford_update)
 
 LOG = logging.getLogger(__name__)
-logging.captureWarnings(True)
 
 
 class Ensemble:
@@ -55,12 +61,16 @@ class Ensemble:
             to unfolded matrices. Only has to be callable
             with (unfolded: Matrix)
         regenerate (Bool): Whether to regenerate the matrices.
+        suffix (str): The file format of the saved members; any suffix
+            Matrix.save understands. Defaults to '.npy'; set to '.npz'
+            for compressed storage.
         std_raw (Matrix): The computed standard deviation of the raw ensemble.
         std_unfolded (Matrix): The computed standard deviation of the unfolded
             ensemble.
         std_firstgen (Matrix): The computed standard deviation of the
             first generation method matrices.
         firstgen_ensemble (np.ndarray): The entire firstgen ensemble.
+            Only available after generate(keep_ensemble=True) or load().
         action_raw (Action[Matrix]): An arbitrary action to apply to each
             generated raw matrix. Defaults to NOP.
         action_unfolded (Action[Matrix]): An arbitrary action to apply to each
@@ -102,31 +112,76 @@ class Ensemble:
         self.unfolded_ensemble: Optional[Matrix] = None
         self.firstgen_ensemble: Optional[Matrix] = None
 
+        # File format of the saved members; any suffix Matrix.save
+        # understands, e.g. '.npz' for compressed storage
+        self.suffix: str = '.npy'
+
+        # In-process content-addressed cache for unfold/first generation
+        self._cache = {}
+        self._cache_maxsize = 64
+
+        # Scratch buffer for the Gaussian perturbation widths
+        self._scratch: Optional[np.ndarray] = None
+
+        # I/O pool for asynchronous saves, running only during generate()
+        self._io_pool = None
+        self._io_futures: List = []
+
         if path is not None:
             self.path = Path(path)
             self.path.mkdir(exist_ok=True)
             try:
                 self.load()
-            except AssertionError:
+            except (AssertionError, FileNotFoundError):
                 pass
         else:
             # Should the ensemble always try to load?
             self.path = Path('ensemble')
             self.path.mkdir(exist_ok=True)
 
+    def __getstate__(self):
+        # The in-process cache is not shipped to the worker processes;
+        # they share the on-disk cache instead.
+        state = self.__dict__.copy()
+        state['_cache'] = {}
+        state['_io_pool'] = None
+        state['_io_futures'] = []
+        return state
+
+    def _save(self, matrix: Matrix, path: Path,
+              snapshot: bool = False) -> None:
+        """Saves the matrix, asynchronously when the I/O pool is running
+
+        File writes release the GIL, so saving through the pool overlaps
+        the disk flush of one member with the compute of the next. The
+        pool is drained before generate() returns.
+
+        Args:
+            matrix: The matrix to save.
+            path: The file to save to.
+            snapshot: Whether to copy the matrix before handing it to
+                the pool. Callers that mutate the matrix afterwards,
+                e.g. through an Action, must set this so the file keeps
+                the pre-mutation content instead of racing with it.
+        """
+        if self._io_pool is None:
+            matrix.save(path)
+        else:
+            if snapshot:
+                matrix = matrix.copy()
+            self._io_futures.append(self._io_pool.submit(matrix.save, path))
+
     def load(self, path: Optional[Union[str, Path]] = None):
         """ Loads a saved ensamble
 
-        Currently only supports '.npy' format.
-
         Args:
             path: The path to the ensemble directory. If the
                 value is None, 'self.path' will be used.
         """
         path = Path(path) if path is not None else Path(self.path)
 
-        self.raw = Matrix(path=path / 'raw.npy')
-        self.firstgen = Matrix(path=path / 'firstgen.npy')
+        self.raw = Matrix(path=path / f'raw{self.suffix}')
+        self.firstgen = Matrix(path=path / f'firstgen{self.suffix}')
         raws = list(path.glob("raw_[0-9]*.*"))
         unfolds = list(path.glob("unfolded_[0-9]*.*"))
         firsts = list(path.glob("firstgen_[0-9]*.*"))
@@ -147,24 +202,54 @@ class Ensemble:
         for i, firstgen in enumerate(firsts):
             self.firstgen_ensemble[i, :, :] = Matrix(path=firstgen).values
 
-        self.std_raw = Matrix(path=path / 'raw_std.npy')
-        self.std_unfolded = Matrix(path=path / 'unfolded_std.npy')
-        self.std_firstgen = Matrix(path=path / 'firstgen_std.npy')
+        self.std_raw = Matrix(path=path / f'raw_std{self.suffix}')
+        self.std_unfolded = Matrix(path=path / f'unfolded_std{self.suffix}')
+        self.std_firstgen = Matrix(path=path / f'firstgen_std{self.suffix}')
 
     def generate(self, number: int, method: str = 'poisson',
-                 regenerate: bool = False) -> None:
+                 regenerate: bool = False, parallel: bool = True,
+                 max_workers: Optional[int] = None,
+                 keep_ensemble: bool = False,
+                 memmap: bool = False,
+                 dtype=np.float32) -> None:
         """Generates an ensemble of matrices and estimates standard deviation
 
         Perturbs the initial raw matrix using either a Gaussian or Poisson
         process, unfolds them and applies the first generation method to them.
         Uses the variation to estimate standard deviation of each step.
 
+        The standard deviations are accumulated online (Welford's
+        algorithm), so only the running mean and M2 of each stream are
+        kept in memory, not the full (number, Ex, Eg) stacks. Set
+        keep_ensemble to also store the full stacks.
+
         Args:
             number: The number of perturbed matrices to generate.
             method: The stochastic method to use to generate the perturbations
                 Can be 'gaussian' or 'poisson'.
             regenerate: Whether to use already generated files (False) or
-                generate them all anew (True).
+                generate them all anew (True). When all member files
+                already exist, a run with regenerate=False batch loads
+                them from disk instead of walking the per-step machinery.
+            parallel: Whether to generate the members in parallel over
+                the available cores. Each member is independent of the
+                others, so the workload scales with the core count.
+                Requires the unfolder and first generation method to be
+                picklable. Set to False to run serially.
+            max_workers: The number of processes to use when parallel.
+                Defaults to the number of cores.
+            keep_ensemble: Whether to store the full raw, unfolded and
+                firstgen ensembles on the instance. Defaults to False,
+                as they can take O(number·Ex·Eg) memory.
+            memmap: Whether to back the kept ensembles by memory mapped
+                files under the save path instead of resident arrays,
+                letting the OS page them in and out. Only meaningful
+                together with keep_ensemble.
+            dtype: The storage dtype of the kept ensembles. The members
+                are photon-count perturbations, so the float32 default
+                loses nothing of note while halving the memory traffic.
+                Pass None to store the members' own dtype. The standard
+                deviations are always accumulated in float64.
         """
         assert self.raw is not None, "Set the raw matrix"
         assert self.unfolder is not None, "Set unfolder"
@@ -172,53 +257,255 @@ class Ensemble:
 
         self.size = number
         self.regenerate = regenerate
-        raw_ensemble = np.zeros((number, *self.raw.shape))
-        unfolded_ensemble = np.zeros_like(raw_ensemble)
-        firstgen_ensemble = np.zeros_like(raw_ensemble)
-
-        for step in tqdm(range(number)):
-            LOG.info(f"Generating {step}")
-            raw = self.generate_raw(step, method)
-            unfolded = self.unfold(step, raw)
-            firstgen = self.first_generation(step, unfolded)
-
-            raw_ensemble[step, :, :] = raw.values
-            unfolded_ensemble[step, :, :] = unfolded.values
-
-            # TODO The first generation method might reshape the matrix
-            if firstgen_ensemble.shape[1:] != firstgen.shape:
-                firstgen_ensemble = np.zeros((number, *firstgen.shape))
-            self.firstgen = firstgen
-            firstgen_ensemble[step, :, :] = firstgen.values
-
-        # TODO Move this to a save step
-        self.raw.save(self.path / 'raw.npy')
-        self.firstgen.save(self.path / 'firstgen.npy')
-        # Calculate standard deviation
-        raw_ensemble_std = np.std(raw_ensemble, axis=0)
-        raw_std = Matrix(raw_ensemble_std, self.raw.Eg, self.raw.Ex,
-                         state='std')
-        raw_std.save(self.path / "raw_std.npy")
-
-        unfolded_ensemble_std = np.std(unfolded_ensemble, axis=0)
-        unfolded_std = Matrix(unfolded_ensemble_std, self.raw.Eg,
-                              self.raw.Ex, state='std')
-        unfolded_std.save(self.path / "unfolded_std.npy")
-
-        firstgen_ensemble_std = np.std(firstgen_ensemble, axis=0)
-        firstgen_std = Matrix(firstgen_ensemble_std, self.firstgen.Eg,
-                              self.firstgen.Ex, state='std')
-        firstgen_std.save(self.path / "firstgen_std.npy")
-
-        self.std_raw = raw_std
-        self.std_unfolded = unfolded_std
-        self.std_firstgen = firstgen_std
+        if regenerate:
+            # Entries from earlier runs must not be served after e.g.
+            # the unfolder parameters changed; the disk lookups already
+            # honor regenerate through load_matrix.
+            self._cache.clear()
+        self._io_pool = ThreadPoolExecutor(max_workers=4)
+        self._io_futures = []
 
-        self.raw_ensemble = raw_ensemble
-        self.unfolded_ensemble = unfolded_ensemble
-        self.firstgen_ensemble = firstgen_ensemble
+        try:
+            # Scan the save path once up front; a stat call per member file
+            # adds up for large ensembles
+            existing = frozenset(p.name for p in self.path.iterdir())
+
+            if not regenerate and all(f"{kind}_{step}{self.suffix}" in existing
+                                      for kind in ('raw', 'unfolded', 'firstgen')
+                                      for step in range(number)):
+                LOG.info("Loading completed ensemble from disk")
+                self._load_completed(number, keep_ensemble, memmap, dtype)
+                return
+
+            shape = self.raw.shape
+            raw_mean, raw_M2 = np.zeros(shape), np.zeros(shape)
+            unfolded_mean, unfolded_M2 = np.zeros(shape), np.zeros(shape)
+            # The first generation method might reshape the matrix, so its
+            # accumulators are not allocated until the first member arrives.
+            firstgen_mean = firstgen_M2 = None
+
+            # The kept stacks are allocated lazily once the first member
+            # arrives, taking shape and dtype from the actual results
+            # instead of assuming those of the raw matrix.
+            raw_ensemble = unfolded_ensemble = firstgen_ensemble = None
+
+            n = 0
+
+            def accumulate(step: int, raw: Matrix, unfolded: Matrix,
+                           firstgen: Matrix) -> None:
+                nonlocal firstgen_mean, firstgen_M2, n
+                nonlocal raw_ensemble, unfolded_ensemble, firstgen_ensemble
+                n += 1
+                welford_update(raw_mean, raw_M2, n, raw.values)
+                welford_update(unfolded_mean, unfolded_M2, n, unfolded.values)
+
+                if keep_ensemble and raw_ensemble is None:
+                    raw_ensemble = self.allocate_ensemble(
+                        'raw', (number, *raw.shape), memmap,
+                        dtype=dtype or raw.values.dtype)
+                    unfolded_ensemble = self.allocate_ensemble(
+                        'unfolded', (number, *unfolded.shape), memmap,
+                        dtype=dtype or unfolded.values.dtype)
+
+                # The first generation method may reshape the matrix; its
+                # shape is set definitively by the first member
+                if firstgen_mean is None:
+                    firstgen_mean = np.zeros(firstgen.shape)
+                    firstgen_M2 = np.zeros(firstgen.shape)
+                    if keep_ensemble:
+                        firstgen_ensemble = self.allocate_ensemble(
+                            'firstgen', (number, *firstgen.shape), memmap,
+                            dtype=dtype or firstgen.values.dtype)
+                elif firstgen_mean.shape != firstgen.shape:
+                    raise ValueError(
+                        f"First generation member {step} has shape "
+                        f"{firstgen.shape}, expected {firstgen_mean.shape}. "
+                        "All members must share a shape.")
+                welford_update(firstgen_mean, firstgen_M2, n, firstgen.values)
+                self.firstgen = firstgen
+
+                if keep_ensemble:
+                    raw_ensemble[step, :, :] = raw.values
+                    unfolded_ensemble[step, :, :] = unfolded.values
+                    firstgen_ensemble[step, :, :] = firstgen.values
+
+            if parallel:
+                # Spawned (not forked) workers: the compiled numba kernels
+                # may already have run in this process, and their threading
+                # layer does not survive a fork.
+                context = multiprocessing.get_context('spawn')
+                with ProcessPoolExecutor(max_workers=max_workers,
+                                         mp_context=context,
+                                         initializer=_setup_worker,
+                                         initargs=(self, method,
+                                                   existing)) as pool:
+                    futures = [pool.submit(_generate_step, step)
+                               for step in range(number)]
+                    for future in tqdm(as_completed(futures), total=number):
+                        accumulate(*future.result())
+            else:
+                # Pre-draw the missing perturbations in bounded chunks:
+                # one vectorized call per chunk amortizes the sampling
+                # overhead, while the chunk size caps the transient
+                # footprint so the streaming accumulation stays O(Ex·Eg)
+                # in memory rather than O(number·Ex·Eg).
+                if method == 'gaussian':
+                    sampler = self.generate_gaussian_batch
+                elif method == 'poisson':
+                    sampler = self.generate_poisson_batch
+                else:
+                    raise ValueError(f"Method {method} is not supported")
+                needed = frozenset(
+                    step for step in range(number)
+                    if regenerate or f"raw_{step}{self.suffix}" not in existing)
+                chunk_size = 50
+
+                def draws():
+                    remaining = len(needed)
+                    while remaining > 0:
+                        chunk = sampler(min(chunk_size, remaining))
+                        remaining -= len(chunk)
+                        yield from chunk
+
+                draw = draws()
+                info_enabled = LOG.isEnabledFor(logging.INFO)
+                for step in tqdm(range(number)):
+                    if info_enabled:
+                        LOG.info("Generating %s", step)
+                    values = next(draw) if step in needed else None
+                    raw = self.generate_raw(step, method, existing, values)
+                    unfolded = self.unfold(step, raw, existing)
+                    firstgen = self.first_generation(step, unfolded, existing)
+                    accumulate(step, raw, unfolded, firstgen)
+
+            # TODO Move this to a save step
+            self._save(self.raw, self.path / f'raw{self.suffix}')
+            self._save(self.firstgen, self.path / f'firstgen{self.suffix}')
+            # Calculate standard deviation
+            # The M2/n normalization matches np.std(..., axis=0)
+            raw_std = Matrix(np.sqrt(raw_M2 / n), self.raw.Eg, self.raw.Ex,
+                             state='std')
+            self._save(raw_std, self.path / f"raw_std{self.suffix}")
+
+            unfolded_std = Matrix(np.sqrt(unfolded_M2 / n), self.raw.Eg,
+                                  self.raw.Ex, state='std')
+            self._save(unfolded_std, self.path / f"unfolded_std{self.suffix}")
+
+            firstgen_std = Matrix(np.sqrt(firstgen_M2 / n), self.firstgen.Eg,
+                                  self.firstgen.Ex, state='std')
+            self._save(firstgen_std, self.path / f"firstgen_std{self.suffix}")
+
+            self.std_raw = raw_std
+            self.std_unfolded = unfolded_std
+            self.std_firstgen = firstgen_std
+
+            self.raw_ensemble = raw_ensemble
+            self.unfolded_ensemble = unfolded_ensemble
+            self.firstgen_ensemble = firstgen_ensemble
+        finally:
+            # Drained even when the run fails, so no save is
+            # silently pending and later _save calls stay synchronous
+            self._drain_io()
+
+    def _drain_io(self) -> None:
+        """Shuts down the I/O pool and surfaces any write error"""
+        if self._io_pool is not None:
+            self._io_pool.shutdown(wait=True)
+            self._io_pool = None
+        for future in self._io_futures:
+            future.result()
+        self._io_futures = []
+
+    def _load_completed(self, number: int, keep_ensemble: bool,
+                        memmap: bool, dtype) -> None:
+        """Fast path of generate() when every member is already on disk
+
+        A previous run saved all 3·number member files, so instead of
+        walking the per-step machinery the members are loaded in
+        parallel with a thread pool, the standard deviations are
+        computed directly from the stacks, and the per-matrix actions
+        are applied as they would be in the slow path.
 
-    def generate_raw(self, step: int, method: str) -> Matrix:
+        Args:
+            number: The number of ensemble members.
+            keep_ensemble: Whether to store the full stacks.
+            memmap: Whether to back the kept stacks by files.
+            dtype: The storage dtype of the kept stacks.
+        """
+        paths = [self.path / f"{kind}_{step}{self.suffix}"
+                 for kind in ('raw', 'unfolded', 'firstgen')
+                 for step in range(number)]
+        with ThreadPoolExecutor() as pool:
+            matrices = list(pool.map(lambda p: Matrix(path=p), paths))
+        raws = matrices[:number]
+        unfolds = matrices[number:2 * number]
+        firsts = matrices[2 * number:]
+
+        for action, members in ((self.action_raw, raws),
+                                (self.action_unfolded, unfolds),
+                                (self.action_firstgen, firsts)):
+            if action.calls:
+                action.map(members)
+        self.firstgen = firsts[-1]
+
+        stacks = [np.stack([member.values for member in members])
+                  for members in (raws, unfolds, firsts)]
+        # NumPy releases the GIL during the reductions, so the three
+        # memory-bound std passes run concurrently
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            stds = list(pool.map(lambda stack: np.std(stack, axis=0),
+                                 stacks))
+
+        for name, stack, values, axes in zip(
+                ('raw', 'unfolded', 'firstgen'), stacks, stds,
+                (self.raw, self.raw, self.firstgen)):
+            std = Matrix(values, axes.Eg, axes.Ex, state='std')
+            self._save(std, self.path / f"{name}_std{self.suffix}")
+            setattr(self, f"std_{name}", std)
+            if keep_ensemble:
+                kept = self.allocate_ensemble(name, stack.shape, memmap,
+                                              dtype=dtype or stack.dtype)
+                kept[...] = stack
+            else:
+                kept = None
+            setattr(self, f"{name}_ensemble", kept)
+
+        self._save(self.raw, self.path / f'raw{self.suffix}')
+        self._save(self.firstgen, self.path / f'firstgen{self.suffix}')
+
+    def allocate_ensemble(self, name: str, shape,
+                          memmap: bool = False,
+                          dtype=np.float64) -> np.ndarray:
+        """Allocates an ensemble array, possibly memory mapped
+
+        With memmap, the array lives in self.path/[name]_ensemble.dat.
+        An existing file of the right size is reopened in place (unless
+        regenerating), so a completed run can be mapped again without
+        recomputation.
+
+        Every slot is overwritten by the caller, so the in-memory
+        allocation is np.empty rather than np.zeros.
+
+        Args:
+            name: The ensemble member name, e.g. 'raw'.
+            shape: The shape of the array.
+            memmap: Whether to back the array by a file.
+            dtype: The dtype of the array.
+        Returns:
+            The allocated array.
+        """
+        if not memmap:
+            return np.empty(shape, dtype=dtype)
+        path = self.path / f"{name}_ensemble.dat"
+        size = np.dtype(dtype).itemsize * int(np.prod(shape))
+        reuse = (path.exists() and path.stat().st_size == size
+                 and not self.regenerate)
+        return np.memmap(path, dtype=dtype,
+                         mode='r+' if reuse else 'w+', shape=shape)
+
+    def generate_raw(self, step: int, method: str,
+                     existing: Optional[FrozenSet[str]] = None,
+                     values: Optional[np.ndarray] = None) -> Matrix:
         """Generate a perturbated matrix
 
         Looks for an already generated file before generating the matrix.
@@ -226,62 +513,76 @@ class Ensemble:
             step: The identifier of the matrix to generate
             method: The name of the method to use. Can be either
                 "gaussian" or "poisson"
+            existing: The file names present in self.path, if already
+                scanned. Spares a stat call per file.
+            values: A pre-sampled perturbation to use, e.g. a slice of
+                a generate_[method]_batch() draw. Sampled here if None.
         Returns:
             The generated matrix
         """
-        LOG.debug(f"Generating raw ensemble {step}")
-        path = self.path / f"raw_{step}.npy"
-        raw = self.load_matrix(path)
+        LOG.debug("Generating raw ensemble %s", step)
+        path = self.path / f"raw_{step}{self.suffix}"
+        raw = self.load_matrix(path, existing)
         if raw is None:
-            LOG.debug(f"(Re)generating {path} using {method} process")
-            if method == 'gaussian':
-                values = self.generate_gaussian()
-            elif method == 'poisson':
-                values = self.generate_poisson()
-            else:
-                raise ValueError(f"Method {method} is not supported")
+            LOG.debug("(Re)generating %s using %s process", path, method)
+            if values is None:
+                if method == 'gaussian':
+                    values = self.generate_gaussian()
+                elif method == 'poisson':
+                    values = self.generate_poisson()
+                else:
+                    raise ValueError(f"Method {method} is not supported")
             raw = Matrix(values, Eg=self.raw.Eg, Ex=self.raw.Ex)
-            raw.save(path)
+            self._save(raw, path, snapshot=bool(self.action_raw.calls))
         self.action_raw.act_on(raw)
         return raw
 
-    def unfold(self, step: int, raw: Matrix) -> Matrix:
+    def unfold(self, step: int, raw: Matrix,
+               existing: Optional[FrozenSet[str]] = None) -> Matrix:
         """Unfolds the raw matrix
 
         Looks for an already generated file before generating the matrix.
         Args:
             step: The identifier of the matrix to unfold.
             raw: The raw matrix to unfold
+            existing: The file names present in self.path, if already
+                scanned. Spares a stat call per file.
         Returns:
             The unfolded matrix
         """
-        LOG.debug(f"Unfolding raw {step}")
-        path = self.path / f"unfolded_{step}.npy"
-        unfolded = self.load_matrix(path)
+        LOG.debug("Unfolding raw %s", step)
+        path = self.path / f"unfolded_{step}{self.suffix}"
+        unfolded = self.load_matrix(path, existing)
         if unfolded is None:
             LOG.debug("Unfolding matrix")
-            unfolded = self.unfolder(raw)
-            unfolded.save(path)
+            unfolded = self.cached(self.unfolder, 'unfolded', raw)
+            self._save(unfolded, path,
+                       snapshot=bool(self.action_unfolded.calls))
         self.action_unfolded.act_on(unfolded)
         return unfolded
 
-    def first_generation(self, step: int, unfolded: Matrix) -> Matrix:
+    def first_generation(self, step: int, unfolded: Matrix,
+                         existing: Optional[FrozenSet[str]] = None) -> Matrix:
         """Applies first generation method to an unfolded matrix
 
         Looks for an already generated file before applying first generation.
         Args:
             step: The identifier of the matrix to unfold.
             unfolded: The matrix to apply first generation method to.
+            existing: The file names present in self.path, if already
+                scanned. Spares a stat call per file.
         Returns:
             The resulting matrix
         """
-        LOG.debug(f"Performing first generation on unfolded {step}")
-        path = self.path / f"firstgen_{step}.npy"
-        firstgen = self.load_matrix(path)
+        LOG.debug("Performing first generation on unfolded %s", step)
+        path = self.path / f"firstgen_{step}{self.suffix}"
+        firstgen = self.load_matrix(path, existing)
         if firstgen is None:
             LOG.debug("Calculating first generation matrix")
-            firstgen = self.first_generation_method(unfolded)
-            firstgen.save(path)
+            firstgen = self.cached(self.first_generation_method,
+                                   'firstgen', unfolded)
+            self._save(firstgen, path,
+                       snapshot=bool(self.action_firstgen.calls))
         self.action_firstgen.act_on(firstgen)
         return firstgen
 
@@ -300,6 +601,8 @@ class Ensemble:
             raise NotImplementedError("Not implemented for raw and unfolding "
                                       "yet. if done, need to redo unfolding "
                                       "and/or first gen method")
+        assert self.firstgen_ensemble is not None, \
+            "Run generate(keep_ensemble=True) or load() first"
 
         ensemble = self.firstgen_ensemble
         matrix = self.firstgen
@@ -309,9 +612,13 @@ class Ensemble:
         if (not do_Ex) and (not do_Eg):
             return
 
-        rebinned = np.zeros((self.size, out_array.size, out_array.size))
+        # Every slot of rebinned is overwritten below
+        rebinned = np.empty((self.size, out_array.size, out_array.size))
+        mean = np.zeros((out_array.size, out_array.size))
+        M2 = np.zeros_like(mean)
         for i in tqdm(range(self.size)):
-            values = ensemble[i]
+            # rebin_2D only accepts double precision
+            values = np.asarray(ensemble[i], dtype=np.float64)
             if do_Ex:
                 values = rebin_2D(values, mids_in=matrix.Ex,
                                   mids_out=out_array, axis=0)
@@ -319,6 +626,7 @@ class Ensemble:
                 values = rebin_2D(values, mids_in=matrix.Eg,
                                   mids_out=out_array, axis=1)
             rebinned[i] = values
+            welford_update(mean, M2, i + 1, rebinned[i])
 
         # correct fg matrix (different attribute) and axis
         values = matrix.values
@@ -331,10 +639,11 @@ class Ensemble:
         matrix = Matrix(values, out_array, out_array)
 
         # recalculate std
-        firstgen_ensemble_std = np.std(rebinned, axis=0)
+        # The M2/n normalization matches np.std(..., axis=0)
+        firstgen_ensemble_std = np.sqrt(M2 / self.size)
         firstgen_std = Matrix(firstgen_ensemble_std, matrix.Eg,
                               matrix.Ex, state='std')
-        firstgen_std.save(self.path / "firstgen_std.npy")
+        self._save(firstgen_std, self.path / f"firstgen_std{self.suffix}")
 
         self.firstgen = matrix
         self.firstgen_ensemble = rebinned
@@ -346,11 +655,11 @@ class Ensemble:
         Returns:
             The resulting array
         """
-        std = np.sqrt(np.where(self.raw.value > 0, self.raw.values, 0))
-        perturbed = np.random.normal(size=self.raw.shape, loc=self.raw.values,
-                                     scale=std)
-        perturbed[perturbed < 0] = 0
-        return perturbed
+        if _in_worker:
+            # Avoid compiling the numba kernels in every worker
+            return gaussian_perturbation_numpy(self.raw.values,
+                                               self._gaussian_std())
+        return gaussian_perturbation(self.raw.values)
 
     def generate_poisson(self) -> np.ndarray:
         """Generates an array with Poisson perturbations of self.raw
@@ -358,21 +667,114 @@ class Ensemble:
         Returns:
             The resulting array
         """
-        std = np.where(self.raw.values > 0, self.raw.values, 0)
-        perturbed = np.random.poisson(std)
-        return perturbed
+        if _in_worker:
+            # Avoid compiling the numba kernels in every worker
+            return poisson_perturbation_numpy(self.raw.values)
+        return poisson_perturbation(self.raw.values)
+
+    def _gaussian_std(self) -> np.ndarray:
+        """The Gaussian perturbation widths √max(raw, 0)
+
+        Computed into a scratch buffer held on the instance, so repeated
+        draws from the same raw matrix allocate no temporaries.
+
+        Returns:
+            The scratch buffer, overwritten with the widths.
+        """
+        if self._scratch is None or self._scratch.shape != self.raw.shape:
+            self._scratch = np.empty_like(self.raw.values)
+        np.maximum(self.raw.values, 0, out=self._scratch)
+        np.sqrt(self._scratch, out=self._scratch)
+        return self._scratch
+
+    def generate_gaussian_batch(self, number: int) -> np.ndarray:
+        """Draws Gaussian perturbations for a whole batch in one call
+
+        A single broadcasted rng.normal() over (number, *raw.shape)
+        amortizes the per-draw overhead across the ensemble.
+
+        Args:
+            number: The number of perturbations to draw.
+        Returns:
+            An array of shape (number, *raw.shape).
+        """
+        rng = np.random.default_rng()
+        batch = rng.normal(loc=self.raw.values, scale=self._gaussian_std(),
+                           size=(number, *self.raw.shape))
+        np.clip(batch, 0, None, out=batch)
+        return batch
+
+    def generate_poisson_batch(self, number: int) -> np.ndarray:
+        """Draws Poisson perturbations for a whole batch in one call
+
+        A single broadcasted rng.poisson() over (number, *raw.shape)
+        amortizes the per-draw overhead across the ensemble.
+
+        Args:
+            number: The number of perturbations to draw.
+        Returns:
+            An array of shape (number, *raw.shape).
+        """
+        rng = np.random.default_rng()
+        mean = np.maximum(self.raw.values, 0)
+        return rng.poisson(mean, size=(number, *self.raw.shape)).astype(
+            self.raw.values.dtype, copy=False)
+
+    def cached(self, method: Callable[[Matrix], Matrix], name: str,
+               matrix: Matrix) -> Matrix:
+        """Applies method to matrix, memoized by the matrix content
+
+        The per-step files only cache by step index. Keying on a digest
+        of the input values additionally catches identical realisations
+        showing up under different steps, e.g. when regenerating with
+        overlapping seeds, both in memory and across runs through
+        self.path/cache/.
 
-    def load_matrix(self, path: Union[Path, str]) -> Union[Matrix, None]:
+        Args:
+            method: The method to apply, e.g. the unfolder.
+            name: The namespace of the cache, e.g. 'unfolded'.
+            matrix: The input matrix. Hashed, not mutated.
+        Returns:
+            The resulting matrix.
+        """
+        key = _content_key(matrix.values)
+        hit = self._cache.get((name, key))
+        if hit is not None:
+            LOG.debug("Content cache hit for %s %s", name, key)
+            return hit.copy()
+
+        path = self.path / 'cache' / f"{name}_{key}.npy"
+        result = self.load_matrix(path)
+        if result is None:
+            result = method(matrix)
+            path.parent.mkdir(exist_ok=True)
+            result.save(path)
+        if len(self._cache) >= self._cache_maxsize:
+            # Evict the oldest entry
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[(name, key)] = result.copy()
+        return result
+
+    def load_matrix(self, path: Union[Path, str],
+                    existing: Optional[FrozenSet[str]] = None
+                    ) -> Union[Matrix, None]:
         """Check if file exists and should not be regenerated
 
         Args:
             path: Path to file to load
+            existing: The file names present in the directory of path,
+                if already scanned. Checked instead of touching the
+                file system.
         Returns:
             Matrix if file exists and can be loaded, None otherwise.
         """
         path = Path(path)
-        if path.exists() and not self.regenerate:
-            LOG.debug(f"Loading {path}")
+        if self.regenerate:
+            return None
+        found = path.name in existing if existing is not None \
+            else path.exists()
+        if found:
+            LOG.debug("Loading %s", path)
             return Matrix(path=path)
 
     def get_raw(self, index: Union[int, List[int]]) -> Union[Matrix,
@@ -385,6 +787,8 @@ class Ensemble:
         Returns:
             The matrix(ces) corresponding to index(ces)
         """
+        assert self.raw_ensemble is not None, \
+            "Run generate(keep_ensemble=True) or load() first"
         try:
             matrices = []
             for i in index:
@@ -408,6 +812,8 @@ class Ensemble:
         Returns:
             The matrix(ces) corresponding to index(ces)
         """
+        assert self.unfolded_ensemble is not None, \
+            "Run generate(keep_ensemble=True) or load() first"
         try:
             matrices = []
             for i in index:
@@ -430,6 +836,8 @@ class Ensemble:
         Returns:
             The matrix(ces) corresponding to index(ces)
         """
+        assert self.firstgen_ensemble is not None, \
+            "Run generate(keep_ensemble=True) or load() first"
         try:
             matrices = []
             for i in index:
@@ -452,3 +860,48 @@ class Ensemble:
         ax[2].set_ylabel(None)
         fig.suptitle("Standard Deviation")
         return fig, ax
+
+
+def _content_key(values: np.ndarray) -> str:
+    """ Computes a digest of the array content """
+    return hashlib.blake2b(values.tobytes(), digest_size=16).hexdigest()
+
+
+# The ensemble is shared with the worker processes through the pool
+# initializer, so that it is pickled once per worker instead of once
+# per step.
+_worker_ensemble: Optional[Ensemble] = None
+_worker_method: Optional[str] = None
+_worker_existing: Optional[FrozenSet[str]] = None
+_in_worker = False
+
+
+def _setup_worker(ensemble: Ensemble, method: str,
+                  existing: Optional[FrozenSet[str]] = None) -> None:
+    """ Initializes a worker process for parallel generation
+
+    The workers are spawned, not forked, and sample through fresh
+    np.random.default_rng() instances seeded from OS entropy, so their
+    draws are independent without any reseeding here.
+    """
+    global _worker_ensemble, _worker_method, _worker_existing, _in_worker
+    _in_worker = True
+    _worker_ensemble = ensemble
+    _worker_method = method
+    _worker_existing = existing
+
+
+def _generate_step(step: int):
+    """ Generates a single ensemble member in a worker process
+
+    Args:
+        step: The identifier of the member to generate
+    Returns:
+        The step along with the raw, unfolded and firstgen matrices
+    """
+    raw = _worker_ensemble.generate_raw(step, _worker_method,
+                                        _worker_existing)
+    unfolded = _worker_ensemble.unfold(step, raw, _worker_existing)
+    firstgen = _worker_ensemble.first_generation(step, unfolded,
+                                                 _worker_existing)
+    return step, raw, unfolded, firstgen
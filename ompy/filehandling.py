@@ -256,6 +256,54 @@ def load_numpy_2D(path: Union[str, Path]
     return mat[1:, 1:], mat[0, 1:], mat[1:, 0]
 
 
+def save_npz_2D(matrix: np.ndarray, Eg: np.ndarray,
+                Ex: np.ndarray, path: Union[str, Path]) -> None:
+    """ Saves a matrix and its axes to a compressed .npz archive
+
+    Counting-statistics matrices compress well, typically cutting the
+    disk traffic severalfold compared to plain .npy.
+    """
+    np.savez_compressed(path, values=matrix, Eg=Eg, Ex=Ex)
+
+
+def load_npz_2D(path: Union[str, Path]
+                ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    with np.load(path) as archive:
+        return archive['values'], archive['Eg'], archive['Ex']
+
+
+def save_hdf5_2D(matrix: np.ndarray, Eg: np.ndarray,
+                 Ex: np.ndarray, path: Union[str, Path]) -> None:
+    """ Saves a matrix and its axes to a chunked, compressed HDF5 file
+
+    Uses the lzf compressor, which is much faster than gzip and still
+    compresses sparse-looking spectra well. Requires h5py.
+    """
+    h5py = _import_h5py()
+    with h5py.File(path, 'w') as file:
+        file.create_dataset('values', data=matrix, chunks=True,
+                            compression='lzf')
+        file.create_dataset('Eg', data=Eg)
+        file.create_dataset('Ex', data=Ex)
+
+
+def load_hdf5_2D(path: Union[str, Path]
+                 ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    h5py = _import_h5py()
+    with h5py.File(path, 'r') as file:
+        return file['values'][()], file['Eg'][()], file['Ex'][()]
+
+
+def _import_h5py():
+    try:
+        import h5py
+    except ImportError as err:
+        raise ImportError(
+            "h5py is needed for '.h5' files. Install it with "
+            "`pip install h5py`.") from err
+    return h5py
+
+
 def load_numpy_1D(path: Union[str, Path]) -> Tuple[np.ndarray, np.ndarray]:
     mat = np.load(path)
     half = int(mat.shape[0] / 2)
@@ -275,6 +323,10 @@ def filetype_from_suffix(path: Path) -> str:
         return 'tar'
     elif suffix == '.npy':
         return 'numpy'
+    elif suffix == '.npz':
+        return 'npz'
+    elif suffix in ('.h5', '.hdf5'):
+        return 'hdf5'
     elif suffix == '.m':
         return 'mama'
     else:
@@ -40,7 +40,6 @@ from .rebin import rebin_2D
 from .action import Action
 
 LOG = logging.getLogger(__name__)
-logging.captureWarnings(True)
 
 
 class FirstGeneration:
@@ -1,2 +1,3 @@
-from .logging import get_logger, available_loggers
+from .logging import (get_logger, available_loggers,
+                      configure_logging)
 from .hooks import plot_hook
@@ -31,6 +31,20 @@ def get_logger(name: str, level=logging.INFO):
     return logger
 
 
+def configure_logging(capture_warnings: bool = True) -> None:
+    """ Configure the global logging behaviour of OMpy
+
+    Earlier versions called logging.captureWarnings(True) as a side
+    effect of importing ompy, silently rerouting the warnings of the
+    whole application. That is now opt-in through this helper.
+
+    Args:
+        capture_warnings: Whether to route warnings.warn() messages
+            through the logging system.
+    """
+    logging.captureWarnings(capture_warnings)
+
+
 def available_loggers() -> List[str]:
     """ Get all available OMpy loggers """
     # Is the code from cython source
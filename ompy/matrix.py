@@ -40,14 +40,14 @@ from typing import (Dict, Iterable, Any, Union, Tuple,
 from .matrixstate import MatrixState
 from .library import div0, fill_negative, diagonal_resolution, diagonal_elements
 from .filehandling import (mama_read, mama_write, save_numpy_1D, load_numpy_1D,
-                           save_numpy_2D, load_numpy_2D, save_tar, load_tar,
-                           filetype_from_suffix)
+                           save_numpy_2D, load_numpy_2D, save_npz_2D,
+                           load_npz_2D, save_hdf5_2D, load_hdf5_2D,
+                           save_tar, load_tar, filetype_from_suffix)
 from .constants import DE_PARTICLE, DE_GAMMA_1MEV
 from .rebin import rebin_2D
 from .decomposition import index
 
 LOG = logging.getLogger(__name__)
-logging.captureWarnings(True)
 
 
 class Matrix():
@@ -199,6 +199,10 @@ class Matrix():
 
         if filetype == 'numpy':
             self.values, self.Eg, self.Ex = load_numpy_2D(path)
+        elif filetype == 'npz':
+            self.values, self.Eg, self.Ex = load_npz_2D(path)
+        elif filetype == 'hdf5':
+            self.values, self.Eg, self.Ex = load_hdf5_2D(path)
         elif filetype == 'tar':
             self.values, self.Eg, self.Eg = load_tar(path)
         elif filetype == 'mama':
@@ -222,6 +226,10 @@ class Matrix():
 
         if filetype == 'numpy':
             save_numpy_2D(self.values, self.Eg, self.Ex, path)
+        elif filetype == 'npz':
+            save_npz_2D(self.values, self.Eg, self.Ex, path)
+        elif filetype == 'hdf5':
+            save_hdf5_2D(self.values, self.Eg, self.Ex, path)
         elif filetype == 'tar':
             save_tar([self.values, self.Eg, self.Ex], path)
         elif filetype == 'mama':
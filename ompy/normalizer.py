@@ -201,7 +201,7 @@ class Normalizer:
             nlds = [nld]
 
         for i, nld in enumerate(nlds):
-            LOG.info(f"\n\n---------\nNormalizing nld #{i}")
+            LOG.info("\n\n---------\nNormalizing nld #%s", i)
             nld = nld.copy()
             LOG.debug("Setting NLD, convert to MeV")
             nld.to_MeV()
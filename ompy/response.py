@@ -18,7 +18,6 @@ from .gauss_smoothing import gauss_smoothing
 from .matrix import Matrix
 
 LOG = logging.getLogger(__name__)
-logging.captureWarnings(True)
 
 DTYPE = np.float64
 
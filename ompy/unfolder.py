@@ -30,7 +30,7 @@ import numpy as np
 import pandas
 import logging
 import warnings
-from typing import Iterable, Optional
+from typing import Iterable, List, Optional
 import termtables as tt
 from scipy.ndimage import gaussian_filter1d
 from copy import copy
@@ -43,7 +43,6 @@ from .rebin import rebin_1D
 
 
 LOG = logging.getLogger(__name__)
-logging.captureWarnings(True)
 
 
 class Unfolder:
@@ -127,8 +126,7 @@ class Unfolder:
         assert self.R is not None, "Response R must be set"
 
         LOG.debug("Comparing calibration of raw against response:"
-                  f"\n{self.raw.calibration()}"
-                  f"\n{self.R.calibration()}")
+                  "\n%s\n%s", self.raw.calibration(), self.R.calibration())
         calibration_diff = self.raw.calibration_array() -\
             self.R.calibration_array()
         eps = 1e-3
@@ -156,10 +154,12 @@ class Unfolder:
         self.raw = copy(raw)
         # Set up the arrays
         self.update_values()
-        unfolded_cube = np.zeros((self.num_iter, *self.r.shape))
-        chisquare = np.zeros((self.num_iter, self.r.shape[0]))
-        fluctuations = np.zeros((self.num_iter, self.r.shape[0]))
-        folded = np.zeros_like(self.r)
+        # Every slot is written before it is read, so skip the zero fill
+        unfolded_cube = np.empty((self.num_iter, *self.r.shape))
+        chisquare = np.empty((self.num_iter, self.r.shape[0]))
+        fluctuations = np.empty((self.num_iter, self.r.shape[0]))
+        # folded is not read in the first step()
+        folded = np.empty_like(self.r)
 
         # Use u⁰ = r as initial guess
         unfolded = self.r
@@ -169,18 +169,18 @@ class Unfolder:
             chisquare[i, :] = self.chi_square(folded)
             fluctuations[i, :] = self.fluctuations(unfolded)
 
-            if LOG.level >= logging.DEBUG:
+            if LOG.isEnabledFor(logging.DEBUG):
                 chisq = np.mean(chisquare[i, :])
-                LOG.debug(f"Iteration {i}: Avg χ²/ν {chisq}")
+                LOG.debug("Iteration %s: Avg χ²/ν %s", i, chisq)
 
         # Score the solutions based on χ² value for each Ex bin
         # and select the best one.
         fluctuations /= self.fluctuations(self.r)
         iscores = self.score(chisquare, fluctuations)
-        unfolded = np.zeros_like(self.r)
+        unfolded = np.empty_like(self.r)
         for iEx in range(self.r.shape[0]):
             unfolded[iEx, :] = unfolded_cube[iscores[iEx], iEx, :]
-        if LOG.level >= logging.DEBUG:
+        if LOG.isEnabledFor(logging.DEBUG):
             print_array = np.column_stack((np.arange(len(self.raw.Ex)),
                                            self.raw.Ex.astype(int),
                                            iscores))
@@ -202,6 +202,80 @@ class Unfolder:
         unfolded.remove_negative()
         return unfolded
 
+    def apply_batch(self, raws: Iterable[Matrix],
+                    response: Optional[Matrix] = None) -> List[Matrix]:
+        """Run unfolding over a batch of equally binned matrices at once
+
+        Stacks the members into a (N, Ex, Eg) tensor so that the folding
+        of each iteration becomes a single batched matrix product
+        serviced by BLAS, instead of N separate products with Python
+        overhead in between. The scoring is identical to apply(), but
+        the best iteration of each Ex row is selected on the fly, so
+        the per-member iteration cube is never materialized.
+
+        Args:
+            raws: The matrices to unfold. Must share binning.
+            response: The response Matrix R to use in unfolding.
+        Returns:
+            The unfolded matrices, in input order.
+        """
+        raws = list(raws)
+        if response is not None:
+            self.R = response
+        self.raw = copy(raws[0])
+        self.update_values()
+        for raw in raws[1:]:
+            assert raw.shape == self.raw.shape, \
+                "All members must share binning"
+
+        r = np.stack([raw.values for raw in raws])
+        self.r = r
+
+        minimum = min(self.minimum_iterations, self.num_iter - 1)
+        best_score = np.full(r.shape[:2], np.inf)
+        best_index = np.zeros(r.shape[:2], dtype=int)
+        best_rows = r.copy()
+        minimum_rows = None
+        fluctuations_r = self.fluctuations(r)
+
+        unfolded = r
+        # folded is not read in the first iteration
+        folded = np.empty_like(r)
+        for i in range(self.num_iter):
+            if i > 0:
+                unfolded = unfolded + (r - folded)
+            folded = unfolded@self.R.values
+            folded[:, self.zeroes] = 0.0
+
+            chisquare = self.chi_square(folded)
+            fluctuations = self.fluctuations(unfolded) / fluctuations_r
+            score = ((1 - self.weight_fluctuation) * chisquare +
+                     self.weight_fluctuation * fluctuations)
+            improved = score < best_score
+            best_score[improved] = score[improved]
+            best_index[improved] = i
+            best_rows[improved] = unfolded[improved]
+            if i == minimum:
+                minimum_rows = unfolded.copy()
+
+        # Enforce the minimum number of iterations, as in score()
+        too_early = best_index < minimum
+        best_rows[too_early] = minimum_rows[too_early]
+
+        unfolded_matrices = []
+        for member, raw in enumerate(raws):
+            self.raw = copy(raw)
+            self.r = raw.values
+            values = best_rows[member]
+            if self.use_compton_subtraction:
+                values = self.compton_subtraction(values)
+            unfolded = Matrix(values, Eg=raw.Eg, Ex=raw.Ex)
+            unfolded.state = "unfolded"
+            unfolded.fill_negative(window_size=10)
+            unfolded.remove_negative()
+            unfolded_matrices.append(unfolded)
+        return unfolded_matrices
+
     def step(self, unfolded, folded, step):
         """Perform a single step of Guttormsen unfolding
 
@@ -227,7 +301,7 @@ class Unfolder:
         Uses the familiar Χ² = Σᵢ (fᵢ-rᵢ)²/rᵢ
         """
         return div0(np.power(folded - self.r, 2),
-                    np.where(self.r > 0, self.r, 0)).sum(axis=1)
+                    np.where(self.r > 0, self.r, 0)).sum(axis=-1)
 
     def fluctuations(self, counts: np.ndarray,
                      sigma: float = 0.12) -> np.ndarray:
@@ -240,9 +314,9 @@ class Unfolder:
 
         a1 = self.raw.Eg[1] - self.raw.Eg[0]
         counts_matrix_smoothed = gaussian_filter1d(
-            counts, sigma=sigma * a1, axis=1)
+            counts, sigma=sigma * a1, axis=-1)
         fluctuations = np.sum(
-            np.abs(counts_matrix_smoothed - counts), axis=1)
+            np.abs(counts_matrix_smoothed - counts), axis=-1)
 
         return fluctuations
 
@@ -401,7 +475,7 @@ def shift_matrix(counts_in_matrix, E_array_in, energy_shift):
     Function which takes a matrix of counts and shifts it
     along axis 1.
     """
-    counts_out_matrix = np.zeros(counts_in_matrix.shape)
+    counts_out_matrix = np.empty(counts_in_matrix.shape)
     for i in range(counts_in_matrix.shape[0]):
         counts_out_matrix[i, :] = shift(counts_in_matrix[i, :], E_array_in,
                                         energy_shift=energy_shift)
@@ -0,0 +1,208 @@
+import pytest
+import ompy as om
+import numpy as np
+
+
+# The helpers must be module level functions to be picklable
+# for the parallel code path
+def unfold_dummy(raw):
+    unfolded = raw.copy()
+    unfolded.state = 'unfolded'
+    return unfolded
+
+
+def firstgen_dummy(unfolded):
+    firstgen = unfolded.copy()
+    firstgen.state = 'firstgen'
+    return firstgen
+
+
+def make_ensemble(path):
+    values = 10*np.ones((5, 5))
+    ensemble = om.Ensemble(raw=om.Matrix(values=values), path=path)
+    ensemble.unfolder = unfold_dummy
+    ensemble.first_generation_method = firstgen_dummy
+    return ensemble
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_generate(tmp_path, parallel):
+    ensemble = make_ensemble(tmp_path / 'ensemble')
+    ensemble.generate(5, parallel=parallel)
+
+    assert ensemble.size == 5
+    assert ensemble.std_raw.shape == (5, 5)
+    assert ensemble.std_unfolded.shape == (5, 5)
+    assert ensemble.std_firstgen.shape == (5, 5)
+    assert np.all(ensemble.std_raw.values >= 0)
+    # The full stacks are only stored upon request
+    assert ensemble.raw_ensemble is None
+
+
+def test_keep_ensemble(tmp_path):
+    ensemble = make_ensemble(tmp_path / 'ensemble')
+    ensemble.generate(5, parallel=False, keep_ensemble=True)
+
+    assert ensemble.raw_ensemble.shape == (5, 5, 5)
+    assert ensemble.unfolded_ensemble.shape == (5, 5, 5)
+    assert ensemble.firstgen_ensemble.shape == (5, 5, 5)
+    # The stacks are stored narrow; the stds accumulate in float64
+    assert ensemble.raw_ensemble.dtype == np.float32
+    assert ensemble.std_raw.values.dtype == np.float64
+    # The streaming standard deviation matches the batch one
+    assert np.allclose(ensemble.std_raw.values,
+                       np.std(ensemble.raw_ensemble, axis=0))
+    assert np.allclose(ensemble.std_firstgen.values,
+                       np.std(ensemble.firstgen_ensemble, axis=0))
+
+
+def test_parallel_matches_saved_files(tmp_path):
+    ensemble = make_ensemble(tmp_path / 'ensemble')
+    ensemble.generate(4)
+    for step in range(4):
+        for kind in 'raw', 'unfolded', 'firstgen':
+            assert (tmp_path / 'ensemble' / f"{kind}_{step}.npy").exists()
+
+
+@pytest.mark.parametrize("method", ['poisson', 'gaussian'])
+def test_perturbation(tmp_path, method):
+    values = 10*np.ones((5, 5))
+    values[0, 0] = -1  # negative counts must not break the sampling
+    ensemble = om.Ensemble(raw=om.Matrix(values=values),
+                           path=tmp_path / 'ensemble')
+    if method == 'poisson':
+        perturbed = ensemble.generate_poisson()
+        assert perturbed.dtype == ensemble.raw.values.dtype
+    else:
+        perturbed = ensemble.generate_gaussian()
+    assert perturbed.shape == (5, 5)
+    assert np.all(perturbed >= 0)
+    assert np.all(np.isfinite(perturbed))
+
+
+@pytest.mark.parametrize("method", ['poisson', 'gaussian'])
+def test_batch_perturbation(tmp_path, method):
+    values = 10*np.ones((5, 5))
+    values[0, 0] = -1
+    ensemble = om.Ensemble(raw=om.Matrix(values=values),
+                           path=tmp_path / 'ensemble')
+    batch = getattr(ensemble, f"generate_{method}_batch")(3)
+    assert batch.shape == (3, 5, 5)
+    assert np.all(batch >= 0)
+    assert np.all(np.isfinite(batch))
+
+
+def test_rebin(tmp_path):
+    ensemble = make_ensemble(tmp_path / 'ensemble')
+    ensemble.generate(4, parallel=False, keep_ensemble=True)
+
+    out = ensemble.firstgen.Ex[::2]
+    ensemble.rebin(out, 'firstgen')
+    assert ensemble.firstgen_ensemble.shape == (4, len(out), len(out))
+    assert np.allclose(ensemble.std_firstgen.values,
+                       np.std(ensemble.firstgen_ensemble, axis=0))
+
+
+def test_memmap(tmp_path):
+    ensemble = make_ensemble(tmp_path / 'ensemble')
+    ensemble.generate(4, parallel=False, keep_ensemble=True, memmap=True)
+
+    assert isinstance(ensemble.firstgen_ensemble, np.memmap)
+    assert (tmp_path / 'ensemble' / 'firstgen_ensemble.dat').exists()
+    assert np.allclose(ensemble.std_raw.values,
+                       np.std(ensemble.raw_ensemble, axis=0))
+
+    # A completed run is mapped again without recomputation
+    again = make_ensemble(tmp_path / 'ensemble')
+    again.generate(4, parallel=False, keep_ensemble=True, memmap=True)
+    assert np.array_equal(np.asarray(again.raw_ensemble),
+                          np.asarray(ensemble.raw_ensemble))
+
+
+def test_content_cache(tmp_path):
+    calls = []
+
+    def counting_unfolder(raw):
+        calls.append(1)
+        return unfold_dummy(raw)
+
+    ensemble = make_ensemble(tmp_path / 'ensemble')
+    ensemble.unfolder = counting_unfolder
+
+    raw = ensemble.generate_raw(0, 'poisson')
+    first = ensemble.unfold(0, raw)
+    # The same realisation under another step is served from the cache
+    second = ensemble.unfold(1, raw)
+    assert len(calls) == 1
+    assert np.array_equal(first.values, second.values)
+    assert list((tmp_path / 'ensemble' / 'cache').glob('unfolded_*.npy'))
+
+
+def test_compressed_members(tmp_path):
+    ensemble = make_ensemble(tmp_path / 'ensemble')
+    ensemble.suffix = '.npz'
+    ensemble.generate(3, parallel=False)
+    for step in range(3):
+        assert (tmp_path / 'ensemble' / f"raw_{step}.npz").exists()
+    assert ensemble.std_firstgen.shape == (5, 5)
+
+    # A completed compressed run is found and batch loaded
+    again = make_ensemble(tmp_path / 'ensemble')
+    again.suffix = '.npz'
+    again.generate(3, parallel=False)
+    assert np.allclose(again.std_raw.values, ensemble.std_raw.values)
+
+
+def test_completed_run_batch_loads(tmp_path):
+    calls = []
+
+    def counting_unfolder(raw):
+        calls.append(1)
+        return unfold_dummy(raw)
+
+    ensemble = make_ensemble(tmp_path / 'ensemble')
+    ensemble.unfolder = counting_unfolder
+    ensemble.generate(3, parallel=False)
+    assert calls
+
+    # A completed run is batch loaded without touching the pipeline
+    calls.clear()
+    ensemble.generate(3, parallel=False, keep_ensemble=True)
+    assert not calls
+    assert ensemble.raw_ensemble.shape == (3, 5, 5)
+    assert ensemble.std_firstgen.shape == (5, 5)
+
+
+def test_unknown_method_raises(tmp_path):
+    ensemble = make_ensemble(tmp_path / 'ensemble')
+    with pytest.raises(ValueError):
+        ensemble.generate(2, method='bogus', parallel=False)
+    # A failed run must not leak the I/O pool
+    assert ensemble._io_pool is None
+
+
+def test_regenerate_clears_content_cache(tmp_path):
+    ensemble = make_ensemble(tmp_path / 'ensemble')
+    raw = ensemble.generate_raw(0, 'poisson')
+    ensemble.unfold(0, raw)
+    stale_keys = set(ensemble._cache)
+    assert stale_keys
+
+    # A regenerating run must not serve entries from before it
+    ensemble.generate(2, parallel=False, regenerate=True)
+    assert not stale_keys & set(ensemble._cache)
+
+
+def test_regenerate(tmp_path):
+    ensemble = make_ensemble(tmp_path / 'ensemble')
+    ensemble.generate(3, parallel=False, keep_ensemble=True)
+    first = ensemble.raw_ensemble.copy()
+
+    # Regeneration should reuse the saved files
+    ensemble.generate(3, parallel=False, keep_ensemble=True)
+    assert np.array_equal(ensemble.raw_ensemble, first)
+
+    # while regenerate=True should draw new perturbations
+    ensemble.generate(3, parallel=False, regenerate=True,
+                      keep_ensemble=True)
+    assert not np.array_equal(ensemble.raw_ensemble, first)
@@ -44,6 +44,27 @@ def test_cut_Si(Si28):
     assert Si28.Ex[0] > 0
 
 
+@pytest.mark.parametrize("suffix", ['.npy', '.npz'])
+def test_save_load_roundtrip(tmp_path, suffix):
+    mat = om.ones((5, 5))
+    path = tmp_path / f"matrix{suffix}"
+    mat.save(path)
+    loaded = om.Matrix(path=path)
+    assert np.array_equal(loaded.values, mat.values)
+    assert np.allclose(loaded.Eg, mat.Eg)
+    assert np.allclose(loaded.Ex, mat.Ex)
+
+
+def test_save_load_hdf5(tmp_path):
+    h5py = pytest.importorskip('h5py')
+    mat = om.ones((5, 5))
+    path = tmp_path / "matrix.h5"
+    mat.save(path)
+    loaded = om.Matrix(path=path)
+    assert np.array_equal(loaded.values, mat.values)
+    assert np.allclose(loaded.Eg, mat.Eg)
+
+
 @pytest.mark.parametrize(
         "E,index",
         [(-10.5, 0),
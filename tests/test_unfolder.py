@@ -0,0 +1,22 @@
+import ompy as om
+import numpy as np
+
+
+def make_unfolder(n=8):
+    response = om.Matrix(values=np.eye(n))
+    unfolder = om.Unfolder(num_iter=10, response=response)
+    unfolder.use_compton_subtraction = False
+    return unfolder
+
+
+def test_apply_batch_matches_apply():
+    rng = np.random.default_rng(42)
+    unfolder = make_unfolder()
+    raws = [om.Matrix(values=rng.poisson(50, size=(8, 8)).astype(float))
+            for _ in range(3)]
+
+    batch = unfolder.apply_batch(raws)
+    for raw, batched in zip(raws, batch):
+        single = unfolder.apply(raw)
+        assert np.allclose(single.values, batched.values)
+        assert batched.state == om.MatrixState.UNFOLDED